@@ -1,13 +1,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
 import datetime
 import os
-import pytz
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager
+from zoneinfo import ZoneInfo
 from streamlit_js_eval import streamlit_js_eval
 from lightweight_charts.widgets import StreamlitChart
-from libsql_client import create_client_sync, ClientSync
+from libsql_client import create_client_sync, Statement
 
 # ========================================
 # 1. PAGE CONFIG
@@ -76,11 +78,33 @@ st.markdown("""
 # ========================================
 # 3. DATABASE CONNECTION & HELPERS
 # ========================================
+POOL_SIZE = 8
+
+class LibsqlPool:
+    """
+    A small bounded pool of libsql clients.
+    The pool is shared process-wide (via st.cache_resource), so concurrent
+    sessions get parallel throughput instead of serializing on one HTTP
+    client, and repeated small range reads keep Turso's page cache hot.
+    """
+    def __init__(self, config: dict, size: int = POOL_SIZE):
+        self._clients = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._clients.put(create_client_sync(**config))
+
+    @contextmanager
+    def acquire(self):
+        client = self._clients.get()
+        try:
+            yield client
+        finally:
+            self._clients.put(client)
+
 @st.cache_resource
-def get_db_connection():
+def get_db_pool():
     """
-    Establishes a connection to the Turso (LibSQL) database.
-    Performs a strict connectivity check.
+    Builds the shared pool of Turso (LibSQL) clients.
+    Performs a strict connectivity check once, at pool creation.
     """
     try:
         # 1. Credentials
@@ -96,19 +120,22 @@ def get_db_connection():
             st.stop()
 
         # 2. Connection Logic
-        http_url = url.replace("libsql://", "https://")
-        config = {"url": http_url, "auth_token": token}
-        
-        client = create_client_sync(**config)
-        
-        # 3. Connectivity Check (The 'Ping')
+        # Keep the libsql:// scheme: the client maps it to the Hrana
+        # WebSocket transport, a persistent multiplexed connection that
+        # saves a TLS/TCP round-trip per query vs. one-shot HTTPS requests
+        config = {"url": url, "auth_token": token}
+
+        pool = LibsqlPool(config)
+
+        # 3. Connectivity Check (The 'Ping') - once per pool, not per checkout
         try:
-            client.execute("SELECT 1")
+            with pool.acquire() as client:
+                client.execute("SELECT 1")
         except Exception as ping_error:
             st.error(f"❌ DATABASE CONNECTION FAILED.\n\nCould not execute handshake query.\nError: {ping_error}")
             st.stop()
-            
-        return client
+
+        return pool
 
     except Exception as e:
         st.error(f"❌ DATABASE INITIALIZATION ERROR: {e}")
@@ -116,95 +143,359 @@ def get_db_connection():
         return None
 
 @st.cache_data
-def get_available_tickers(_client: ClientSync):
+def get_available_tickers(_pool: LibsqlPool):
     """
     Fetches the list of available tickers from the symbol_map table.
     """
     try:
-        rs = _client.execute("SELECT user_ticker FROM symbol_map ORDER BY user_ticker;")
+        with _pool.acquire() as client:
+            rs = client.execute("SELECT user_ticker FROM symbol_map ORDER BY user_ticker;")
         return [row["user_ticker"] for row in rs.rows]
     except Exception as e:
         st.error(f"Failed to fetch tickers: {e}")
         return []
 
-@st.cache_data
-def load_master_data(_client: ClientSync, ticker: str, earliest_date_str: str, include_eth: bool):
+SNAPSHOT_DIR = os.environ.get(
+    "MARKET_REWIND_CACHE_DIR",
+    os.path.expanduser("~/.cache/market-rewind")
+)
+
+def _snapshot_path(spec):
+    ticker, earliest, end, eth = spec
+    session_tag = "eth" if eth else "reg"
+    return os.path.join(SNAPSHOT_DIR, f"{ticker}_{earliest}_{end}_{session_tag}.parquet")
+
+def _snapshot_eligible(spec):
+    """
+    Only bounded ranges that ended before today are immutable enough to
+    persist on disk; open-ended or still-filling ranges must hit the DB.
+    """
+    end_date_str = spec[2]
+    return bool(end_date_str) and end_date_str <= datetime.date.today().isoformat()
+
+# Disk budget for the snapshot directory. Replay specs differ only by
+# end day, so each replayed day persists a near-full-history file;
+# without a bound the directory grows roughly quadratically with the
+# number of distinct days replayed.
+SNAPSHOT_MAX_BYTES = 256 * 1024 * 1024
+
+def _prune_snapshots():
+    """
+    Evicts least-recently-used snapshot files until the directory fits
+    the byte budget. Reads bump mtime, so eviction order is true LRU.
+    """
+    try:
+        with os.scandir(SNAPSHOT_DIR) as entries:
+            files = [
+                (e.stat().st_mtime, e.stat().st_size, e.path)
+                for e in entries if e.name.endswith('.parquet')
+            ]
+        total = sum(size for _, size, _ in files)
+        files.sort()
+        for _, size, path in files:
+            if total <= SNAPSHOT_MAX_BYTES:
+                break
+            os.remove(path)
+            total -= size
+    except Exception:
+        # Same best-effort contract as the writes
+        pass
+
+def _read_snapshot(spec):
+    """
+    Returns the locally persisted frame for a spec, or None to signal
+    the caller to fetch from Turso.
+    """
+    if not _snapshot_eligible(spec):
+        return None
+    path = _snapshot_path(spec)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+        # Mark as recently used for _prune_snapshots' eviction order
+        os.utime(path)
+        # Re-pin the ns resolution the in-memory paths assume; a parquet
+        # round-trip under a future pandas may restore a coarser unit
+        df.index = df.index.as_unit('ns')
+        df['time'] = df.index
+        return df
+    except Exception:
+        # Corrupt or partial file: fall back to the network
+        return None
+
+def _write_snapshot(spec, df):
+    if df.empty or not _snapshot_eligible(spec):
+        return
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        df.to_parquet(_snapshot_path(spec))
+        _prune_snapshots()
+    except Exception:
+        # Snapshots are a best-effort cache; never fail a render over one
+        pass
+
+def _build_market_query(ticker: str, earliest_date_str: str, end_date_str: str, include_eth: bool):
+    """
+    Builds the parameterized 1-minute OHLCV query for a single ticker.
+    `end_date_str` is an exclusive upper bound; pass None for full history.
+    """
+    session_filter = "" if include_eth else "AND session = 'REG'"
+    params = [ticker, earliest_date_str]
+
+    if end_date_str:
+        range_filter = "AND timestamp >= ? AND timestamp < ?"
+        params.append(end_date_str)
+    else:
+        range_filter = "AND timestamp >= ?"
+
+    # Epoch seconds computed DB-side: parsing integers with a fixed unit
+    # is ~10x faster in pandas than general-purpose string parsing, and
+    # the result is unambiguously tz-aware UTC
+    query = f"""
+        SELECT CAST(strftime('%s', timestamp) AS INTEGER) AS ts_epoch,
+               open, high, low, close, volume
+        FROM market_data
+        WHERE symbol = ? {session_filter} {range_filter}
+        ORDER BY timestamp;
+    """
+    return query, params
+
+FRAME_CACHE_ENTRIES = 32
+
+@st.cache_resource
+def _frame_cache():
+    """
+    The per-spec master-frame store, shared by load_master_data and
+    fetch_frame_bundle so a frame fetched by either path is warm for
+    both. Keyed by (ticker, earliest, end, eth) spec; LRU-bounded by
+    _remember_frame. Frames are shared no-copy: cache_data would
+    deep-copy 100k-row histories on every return, so callers must treat
+    them as read-only — every downstream path works on views or derived
+    frames.
+    """
+    return OrderedDict()
+
+def _remember_frame(cache, spec, df):
+    cache[spec] = df
+    cache.move_to_end(spec)
+    while len(cache) > FRAME_CACHE_ENTRIES:
+        cache.popitem(last=False)
+
+def _lookup_frame(cache, spec):
+    """
+    Frame for `spec` from the in-memory store or a parquet snapshot, or
+    None if it has to come from the network. Hits refresh LRU order.
+    """
+    df = cache.get(spec)
+    if df is not None:
+        cache.move_to_end(spec)
+        return df
+    df = _read_snapshot(spec)
+    if df is not None:
+        _remember_frame(cache, spec, df)
+    return df
+
+def load_master_data(_pool: LibsqlPool, ticker: str, earliest_date_str: str, end_date_str: str, include_eth: bool):
     """
     Loads raw 1-minute data from the database.
+    Served from the shared per-spec frame store when warm; completed
+    date ranges are served from (and persisted to) local Parquet
+    snapshots, skipping the network entirely on repeat sessions.
+    `end_date_str` is an exclusive upper bound pushed into the SQL WHERE clause;
+    pass None for an unbounded (full history) load.
     Includes explicit error reporting for debugging data issues.
     """
+    spec = (ticker, earliest_date_str, end_date_str, include_eth)
+    cache = _frame_cache()
+    cached = _lookup_frame(cache, spec)
+    if cached is not None:
+        return cached
+
     try:
-        if include_eth:
-            query = """
-                SELECT timestamp, open, high, low, close, volume 
-                FROM market_data 
-                WHERE symbol = ? AND timestamp >= ?
-                ORDER BY timestamp;
-            """
-            params = [ticker, earliest_date_str]
-        else:
-            query = """
-                SELECT timestamp, open, high, low, close, volume 
-                FROM market_data 
-                WHERE symbol = ? AND session = 'REG' AND timestamp >= ?
-                ORDER BY timestamp;
-            """
-            params = [ticker, earliest_date_str]
-            
-        rs = _client.execute(query, params)
-        
+        query, params = _build_market_query(ticker, earliest_date_str, end_date_str, include_eth)
+        with _pool.acquire() as client:
+            rs = client.execute(query, params)
+
     except Exception as e:
         # EXPLICIT ERROR REPORTING
         st.error(f"❌ DB READ ERROR for {ticker}: {e}")
         return pd.DataFrame()
 
-    df = pd.DataFrame(rs.rows, columns=["timestamp", "open", "high", "low", "close", "volume"])
-    
-    if df.empty:
-        # Debug info if data is missing but no error occurred
-        # Only show this if specific dates (like 2024/2025) are expected but missing
-        # st.warning(f"⚠️ Query returned 0 rows for {ticker} (>= {earliest_date_str}).")
-        return df
+    df = _parse_market_rows(rs.rows)
+    _write_snapshot(spec, df)
+    _remember_frame(cache, spec, df)
+    return df
+
+def fetch_frame_bundle(_pool: LibsqlPool, specs: tuple):
+    """
+    Fetches OHLCV frames for every chart spec, batching only the specs
+    the shared per-spec store doesn't already hold into a single
+    round-trip. Previously the bundle was cached per whole-specs-tuple,
+    so one chart changing ticker (or the replay day rolling over)
+    re-fetched every spec and duplicated full-year frames across bundle
+    entries. `specs` is a tuple of (ticker, earliest_date_str,
+    end_date_str, include_eth) tuples; returns a dict mapping each spec
+    to its DataFrame, same read-only contract as load_master_data.
+    """
+    cache = _frame_cache()
+    frames = {}
+    misses = []
+    for spec in specs:
+        df = _lookup_frame(cache, spec)
+        if df is not None:
+            frames[spec] = df
+        else:
+            misses.append(spec)
+
+    if not misses:
+        return frames
+
+    stmts = [
+        Statement(*_build_market_query(ticker, earliest, end, eth))
+        for ticker, earliest, end, eth in misses
+    ]
+    try:
+        with _pool.acquire() as client:
+            results = client.batch(stmts)
+    except Exception as e:
+        st.error(f"❌ DB BATCH READ ERROR: {e}")
+        # Error frames are not remembered, so the next rerun retries
+        frames.update({spec: pd.DataFrame() for spec in misses})
+        return frames
+
+    for spec, rs in zip(misses, results):
+        df = _parse_market_rows(rs.rows)
+        _write_snapshot(spec, df)
+        _remember_frame(cache, spec, df)
+        frames[spec] = df
+    return frames
+
+def _parse_market_rows(rows):
+    """
+    Converts raw result rows into a typed, tz-aware DataFrame.
+    Dtypes are pinned once here (float32 OHLC, int32 volume) and the frame
+    carries a UTC DatetimeIndex, so downstream resampling never pays
+    another set_index/reset_index or dtype-inference pass.
+    """
+    if not rows:
+        # No error occurred but the query matched nothing; callers show
+        # the "no data" message, so stay quiet here.
+        return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
 
     # Ensure timezone aware (UTC)
-    # If the DB string format is weird, this line might fail, so we wrap it
+    # If the DB string format is weird, this might fail, so we wrap it
     try:
-        df['time'] = pd.to_datetime(df['timestamp'], utc=True)
-        # Convert numeric columns
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col])
+        # One C-level transpose of the row objects into per-column tuples
+        # (AoS -> SoA), then a single typed cast per column — no 2-D
+        # object matrix and no pandas dtype inference in between
+        ts_raw, o_raw, h_raw, l_raw, c_raw, v_raw = zip(*rows)
+        # as_unit('ns'): on pandas 3 a unit='s' parse keeps second
+        # resolution, which would silently break every int64-based
+        # comparison downstream (see resample/searchsorted paths)
+        times = pd.DatetimeIndex(
+            pd.to_datetime(np.asarray(ts_raw, dtype=np.int64), unit='s', utc=True)
+        ).as_unit('ns')
+        df = pd.DataFrame({
+            'time': times,
+            'open': np.asarray(o_raw, dtype=np.float32),
+            'high': np.asarray(h_raw, dtype=np.float32),
+            'low': np.asarray(l_raw, dtype=np.float32),
+            'close': np.asarray(c_raw, dtype=np.float32),
+            'volume': np.asarray(v_raw, dtype=np.int32),
+        }, index=times)
     except Exception as parse_error:
         st.error(f"❌ DATA PARSING ERROR: {parse_error}")
-        return pd.DataFrame()
-    
-    return df[['time', 'open', 'high', 'low', 'close', 'volume']]
+        return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+
+    return df
 
 def resample_data(df, timeframe):
     """
     Aggregates raw 1-minute data into larger candles (5Min, 15Min, 1Day, etc).
     """
     if df.empty:
-        return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume', 'color'])
+        return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume'])
 
-    df = df.set_index('time')
-    
-    agg = {
-        'open': 'first', 
-        'high': 'max', 
-        'low': 'min', 
-        'close': 'last', 
-        'volume': 'sum'
-    }
-    
-    resampled = df.resample(timeframe).agg(agg).dropna().reset_index()
-    
-    # Apply color logic AFTER aggregation
-    resampled['color'] = np.where(
-        resampled['open'] > resampled['close'],
-        'rgba(239, 83, 80, 0.8)',  # Red
-        'rgba(38, 166, 154, 0.8)'   # Green
-    )
-    return resampled
+    # One vectorized pass instead of pandas resample/groupby dispatch:
+    # the index is already sorted UTC 1-minute bars, so flooring it gives
+    # monotone bucket labels and each OHLCV column reduces via a single
+    # reduceat call. Empty buckets never materialize, which also replaces
+    # the old dropna, and no color column: lightweight-charts colors
+    # candles and volume bars itself from open/close.
+    buckets = df.index.floor(timeframe)
+    # asi8 only feeds the change-point scan, where equality is
+    # resolution-agnostic; bucket times come from the index itself
+    codes = buckets.asi8
+    first_idx = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    last_idx = np.append(first_idx[1:], len(codes)) - 1
+
+    return pd.DataFrame({
+        'time': buckets[first_idx],
+        'open': df['open'].to_numpy()[first_idx],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), first_idx),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), first_idx),
+        'close': df['close'].to_numpy()[last_idx],
+        # Sum in int64 so daily buckets can't overflow, then pin back
+        'volume': np.add.reduceat(df['volume'].to_numpy(dtype=np.int64),
+                                  first_idx).astype(np.int32),
+    })
+
+# LRU sized for a realistic working set: a handful of tickers across six
+# timeframes and two session modes, without letting old frames pile up
+RESAMPLE_CACHE_ENTRIES = 64
+
+@st.cache_resource(max_entries=RESAMPLE_CACHE_ENTRIES, show_spinner=False)
+def resample_all(_df, spec):
+    """
+    All timeframes of one master frame, built in one pass and cached
+    together. Charts showing the same ticker at different TFs share a
+    single cache entry instead of resampling independently, and
+    cache_resource hands back the same dict every time — no per-rerun
+    frame copy. The frame itself is excluded from the cache key (hashing
+    100k rows per rerun would cost more than it saves); `spec` — the
+    (ticker, range, eth) tuple the frame was fetched with — uniquely
+    determines its contents. Callers must treat the frames as read-only.
+    """
+    return {tf: resample_data(_df, tf) for tf in TF_MAP.values()}
+
+def resample_incremental(cache_key, sliced_df, timeframe):
+    """
+    Maintains the resampled frame for one chart across replay ticks.
+    During monotonic playback the frame at T+delta is the previous frame
+    plus at most a refreshed tail bucket, so only rows from the start of
+    the last (possibly still-forming) bucket are re-aggregated and spliced
+    onto the cached prefix. Ticker/TF changes or backward seeks fall back
+    to a full resample.
+    """
+    cache = st.session_state.setdefault("resample_cache", {})
+
+    if not sliced_df.empty:
+        end_ts = sliced_df['time'].iat[-1]
+        entry = cache.get(cache_key)
+
+        if entry is not None:
+            last_end, cached = entry
+            if end_ts == last_end:
+                # No new raw rows since last tick (e.g. overnight gap)
+                return cached
+            if end_ts > last_end and not cached.empty:
+                # Re-aggregate only the tail bucket plus anything newer.
+                # Binary search on the sorted index instead of a full
+                # boolean mask + copy of the sliced frame.
+                tail_start = cached['time'].iat[-1]
+                cut = sliced_df.index.searchsorted(tail_start, side='left')
+                tail = resample_data(sliced_df.iloc[cut:], timeframe)
+                result = pd.concat([cached.iloc[:-1], tail], ignore_index=True)
+                cache[cache_key] = (end_ts, result)
+                return result
+
+        # Cold start or backward seek: full recompute
+        result = resample_data(sliced_df, timeframe)
+        cache[cache_key] = (end_ts, result)
+        return result
+
+    return resample_data(sliced_df, timeframe)
 
 # ========================================
 # 4. CHART LAYOUT HELPER
@@ -226,43 +517,129 @@ def get_dynamic_chart_height(num_charts, viewport_height):
 
     return int(per_chart)
 
+def _grid(num_charts):
+    """
+    Builds one layout slot per chart: two columns per row, with an odd
+    trailing chart spanning the full width. One code path for every
+    chart count keeps widget keys and tree shape stable across reruns.
+    """
+    slots = []
+    for _ in range(num_charts // 2):
+        slots.extend(st.columns(2))
+    if num_charts % 2:
+        slots.append(st.container())
+    return slots
+
 # ========================================
 # 5. RENDER CHART UNIT (The Logic Core)
 # ========================================
-def render_chart_unit(chart_id, db_client, chart_height, global_dt, show_border=True, default_tf="1 Min", default_ticker=None):
+EARLIEST_DATE = "2024-01-01"
+
+# Market timezone: stdlib zoneinfo (C-accelerated, no pytz localize dance)
+NY_TZ = ZoneInfo("America/New_York")
+MARKET_PREOPEN = datetime.time(9, 29)
+
+def market_open_utc(day):
+    """9:29 AM ET (pre-open) on `day`, as a UTC datetime."""
+    return datetime.datetime.combine(day, MARKET_PREOPEN, tzinfo=NY_TZ).astimezone(datetime.timezone.utc)
+
+# Display label -> pandas resample rule
+TF_MAP = {
+    "1 Min": "1min",
+    "5 Min": "5min",
+    "15 Min": "15min",
+    "30 Min": "30min",
+    "1 Hr": "1H",
+    "1 Day": "1D",
+}
+
+# Resample rule -> step delta, parsed once at import instead of running
+# pd.to_timedelta's string parser on every rerun of every chart
+TF_DELTAS = {rule: pd.Timedelta(rule) for rule in TF_MAP.values()}
+
+# (min_bar_spacing, right_offset) per timeframe
+SPACING_REPLAY = {
+    "1 Min": (8.0, 45),
+    "5 Min": (10.0, 30),
+    "15 Min": (12.0, 20),
+    "30 Min": (14.0, 10),
+    "1 Hr": (16.0, 5),
+    "1 Day": (20.0, 2),
+}
+SPACING_REPLAY_DEFAULT = (10.0, 20)
+
+# Viewer Mode (Dense Overview)
+SPACING_VIEWER = {
+    "1 Min": (0.5, 5),
+    "5 Min": (2.0, 5),
+    "15 Min": (4.0, 5),
+    "30 Min": (7.0, 5),
+    "1 Hr": (8.0, 5),
+    "1 Day": (10.0, 5),
+}
+SPACING_VIEWER_DEFAULT = (5.0, 5)
+
+# Max candles shipped to the widget during replay; anything further back
+# sits behind the left edge and is never drawn
+REPLAY_VISIBLE_BARS = 300
+
+# Per-layout (default_tf, default_ticker) for each chart slot
+CHART_LAYOUT_DEFAULTS = {
+    1: [("1 Min", None)],
+    2: [("1 Min", None), ("1 Day", None)],
+    3: [("1 Min", None), ("30 Min", None), ("1 Day", None)],
+    4: [("1 Min", None), ("30 Min", None), ("1 Day", None), ("30 Min", "SPY")],
+}
+
+
+# Per-chart session defaults; the ticker is resolved lazily because it
+# depends on the fetched ticker list
+CHART_STATE_DEFAULTS = {
+    "tf": "1 Min",
+    "eth": False,
+    "view_mode": "Viewer Mode",
+}
+
+def _init_chart_state(chart_id, tickers, default_tf="1 Min", default_ticker=None):
     """
-    Renders a single chart unit.
-    Implements Dynamic Construction (Slice -> Resample) to prevent look-ahead bias.
+    Seeds the per-chart session state keys before any chart renders,
+    so the workspace can compute fetch specs for the whole grid up front.
+    One setdefault pass over the defaults dict replaces a branch per key.
     """
-    # Unique keys for session state
+    for suffix, value in dict(CHART_STATE_DEFAULTS, tf=default_tf).items():
+        st.session_state.setdefault(f"c{chart_id}_{suffix}", value)
+
     k_ticker = f"c{chart_id}_ticker"
-    k_tf = f"c{chart_id}_tf"
-    k_eth = f"c{chart_id}_eth" 
-    k_view_mode = f"c{chart_id}_view_mode" 
-    
-    # --- Initialize Local State ---
     if k_ticker not in st.session_state:
-        tickers = get_available_tickers(db_client)
         if default_ticker and default_ticker in tickers:
             st.session_state[k_ticker] = default_ticker
         else:
             st.session_state[k_ticker] = tickers[0] if tickers else ""
-        
-    if k_tf not in st.session_state:
-        st.session_state[k_tf] = default_tf
-        
-    if k_eth not in st.session_state:
-        st.session_state[k_eth] = False 
-    
-    if k_view_mode not in st.session_state:
-        st.session_state[k_view_mode] = "Viewer Mode"
+
+def render_chart_unit(chart_id, db_pool, chart_height, tickers, bundle, show_border=True):
+    """
+    Renders a single chart unit. The workspace wraps this in st.fragment
+    (with the playback cadence as run_every), so interacting with one
+    chart's controls or a scheduled tick reruns only that chart, not the
+    whole grid. The workspace prefetches raw frames into `bundle`; the
+    unit falls back to the cached loader when a fragment-scoped rerun has
+    changed its ticker/TF/ETH since the last prefetch.
+    """
+    # Unique keys for session state
+    k_ticker = f"c{chart_id}_ticker"
+    k_tf = f"c{chart_id}_tf"
+    k_eth = f"c{chart_id}_eth"
+    k_view_mode = f"c{chart_id}_view_mode"
+
+    # Read the clock from session state so fragment-scoped reruns see
+    # the current tick rather than a stale argument
+    global_dt = st.session_state.get("global_dt")
 
     # --- Render Controls ---
     with st.container(border=show_border):
         c1, c2, c3, c4, _ = st.columns([1.5, 1.5, 2.0, 1.0, 1.0])
-        
+
         with c1:
-            tickers = get_available_tickers(db_client)
             sel_ticker = st.selectbox(
                 "Ticker", tickers, 
                 key=k_ticker, 
@@ -270,20 +647,12 @@ def render_chart_unit(chart_id, db_client, chart_height, global_dt, show_border=
             )
         
         with c2:
-            tf_map = {
-                "1 Min": "1min", 
-                "5 Min": "5min", 
-                "15 Min": "15min", 
-                "30 Min": "30min", 
-                "1 Hr": "1H", 
-                "1 Day": "1D"
-            }
             sel_tf_str = st.selectbox(
-                "TF", list(tf_map.keys()), 
-                key=k_tf, 
+                "TF", list(TF_MAP.keys()),
+                key=k_tf,
                 label_visibility="collapsed"
             )
-            sel_tf_agg = tf_map[sel_tf_str]
+            sel_tf_agg = TF_MAP[sel_tf_str]
         
         with c3:
             st.selectbox(
@@ -297,10 +666,29 @@ def render_chart_unit(chart_id, db_client, chart_height, global_dt, show_border=
 
         is_replay_mode = (st.session_state[k_view_mode] == "Replay Mode")
 
-        # --- Data Loading (Raw 1-Min) ---
-        EARLIEST = "2024-01-01"
-        master_data_raw = load_master_data(db_client, sel_ticker, EARLIEST, is_eth)
-        
+        # --- Resolve Raw Data (Prefetched Bundle or Cached Loader) ---
+        # The spec is recomputed here because a fragment-scoped rerun may
+        # have changed this chart's inputs since the workspace prefetch.
+        if is_replay_mode and global_dt is not None:
+            end_date_str = (global_dt.date() + datetime.timedelta(days=1)).isoformat()
+        else:
+            end_date_str = None
+        spec = (sel_ticker, EARLIEST_DATE, end_date_str, is_eth)
+
+        master_data_raw = bundle.get(spec)
+        if master_data_raw is None and end_date_str is not None:
+            # Mode just switched on a fragment-scoped rerun: the bundle may
+            # still hold the full-history frame for this ticker/session.
+            # Slicing that locally to the day bound beats a fresh query.
+            full = bundle.get((sel_ticker, EARLIEST_DATE, None, is_eth))
+            if full is not None and not full.empty:
+                cut = full.index.searchsorted(
+                    pd.Timestamp(end_date_str, tz='UTC'), side='left'
+                )
+                master_data_raw = full.iloc[:cut]
+        if master_data_raw is None:
+            master_data_raw = load_master_data(db_pool, *spec)
+
         # Determine latest date for initial setup (runs once)
         if not master_data_raw.empty and "global_latest_db_date" not in st.session_state:
             st.session_state.global_latest_db_date = master_data_raw['time'].max().date()
@@ -316,20 +704,37 @@ def render_chart_unit(chart_id, db_client, chart_height, global_dt, show_border=
         # Report Timeframe Delta (for Global Stepper)
         if "chart_deltas" not in st.session_state: 
             st.session_state.chart_deltas = {}
-        st.session_state.chart_deltas[chart_id] = pd.to_timedelta(sel_tf_agg)
+        st.session_state.chart_deltas[chart_id] = TF_DELTAS[sel_tf_agg]
+
+        # Report the last available bar so the clock can auto-pause at
+        # end-of-data instead of ticking forever past it
+        if "chart_max_ts" not in st.session_state:
+            st.session_state.chart_max_ts = {}
+        if not master_data_raw.empty:
+            st.session_state.chart_max_ts[chart_id] = master_data_raw.index[-1]
 
         # --- Dynamic Resampling Logic ---
         if not master_data_raw.empty:
             if is_replay_mode and global_dt is not None:
-                # Filter raw data to current time
-                sliced_raw = master_data_raw[master_data_raw['time'] <= global_dt]
-                # Resample ONLY the visible data
-                final_chart_data = resample_data(sliced_raw, sel_tf_agg)
+                # Filter raw data to current time. The index is sorted
+                # (DB ORDER BY timestamp), so find the cut point with an
+                # O(log N) binary search on the index instead of an O(N)
+                # boolean mask + fancy-indexed copy. Searching the index
+                # (not its raw int64 view) keeps the comparison correct
+                # whatever resolution the index carries.
+                cut = master_data_raw.index.searchsorted(
+                    pd.Timestamp(global_dt), side='right'
+                )
+                sliced_raw = master_data_raw.iloc[:cut]
+                # Resample ONLY the visible data, reusing the previous
+                # tick's buckets where possible
+                cache_key = (chart_id, sel_ticker, sel_tf_agg, is_eth)
+                final_chart_data = resample_incremental(cache_key, sliced_raw, sel_tf_agg)
             else:
-                # Viewer Mode: Full Data
-                final_chart_data = resample_data(master_data_raw, sel_tf_agg)
+                # Viewer Mode: pre-aggregated per spec, shared across charts
+                final_chart_data = resample_all(master_data_raw, spec)[sel_tf_agg]
         else:
-             final_chart_data = pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume', 'color'])
+             final_chart_data = pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume'])
 
         # --- Chart Rendering ---
         try:
@@ -340,48 +745,29 @@ def render_chart_unit(chart_id, db_client, chart_height, global_dt, show_border=
 
             # --- Visual Settings (Spacing & Offsets) ---
             if is_replay_mode:
-                # Custom Spacing & Offset per Timeframe
-                if sel_tf_str == "1 Min": 
-                    spacing = 8.0
-                    offset = 45
-                elif sel_tf_str == "5 Min": 
-                    spacing = 10.0
-                    offset = 30
-                elif sel_tf_str == "15 Min": 
-                    spacing = 12.0
-                    offset = 20
-                elif sel_tf_str == "30 Min": 
-                    spacing = 14.0
-                    offset = 10 
-                elif sel_tf_str == "1 Hr": 
-                    spacing = 16.0
-                    offset = 5
-                elif sel_tf_str == "1 Day": 
-                    spacing = 20.0
-                    offset = 2 
-                else: 
-                    spacing = 10.0
-                    offset = 20
+                spacing, offset = SPACING_REPLAY.get(sel_tf_str, SPACING_REPLAY_DEFAULT)
             else:
-                # Viewer Mode (Dense Overview)
-                offset = 5
-                if sel_tf_str == "1 Min": spacing = 0.5
-                elif sel_tf_str == "5 Min": spacing = 2.0
-                elif sel_tf_str == "15 Min": spacing = 4.0
-                elif sel_tf_str == "30 Min": spacing = 7.0
-                elif sel_tf_str == "1 Hr": spacing = 8.0
-                elif sel_tf_str == "1 Day": spacing = 10.0
-                else: spacing = 5.0
+                spacing, offset = SPACING_VIEWER.get(sel_tf_str, SPACING_VIEWER_DEFAULT)
 
             chart.time_scale(min_bar_spacing=spacing, right_offset=offset)
 
             # --- Set Data ---
             if not final_chart_data.empty:
-                c_data = final_chart_data.copy()
-                # Format time for Lightweight Charts
-                c_data['time'] = c_data['time'].apply(lambda x: x.isoformat())
-                chart.set(c_data)
-            
+                if is_replay_mode and len(final_chart_data) > REPLAY_VISIBLE_BARS:
+                    # Ship only the visible window: payload drops from the
+                    # full resampled history to ~300 rows per tick
+                    final_chart_data = final_chart_data.iloc[-REPLAY_VISIBLE_BARS:]
+
+                # The resampled frame ships as-is: the wrapper's own
+                # vectorized datetime->epoch conversion is the only
+                # per-tick time work left, so there is no prepared
+                # payload to memoize anymore.
+                chart.set(final_chart_data)
+
+            # Full set()+load() per rerun is deliberate: Streamlit rebuilds
+            # the component HTML every rerun, so lightweight-charts'
+            # incremental update() API has no live widget to target. The
+            # 300-bar replay window keeps the rebuilt payload small instead.
             chart.load()
 
         except Exception as e:
@@ -391,36 +777,32 @@ def render_chart_unit(chart_id, db_client, chart_height, global_dt, show_border=
 # 6. WORKSPACE FRAGMENT (The Global Loop)
 # ========================================
 @st.fragment
-def render_workspace_fragment(db_client, num_charts, chart_height):
+def render_workspace_fragment(db_pool, num_charts, chart_height):
     """
     Renders the unified chart grid and the global control bar.
     """
     
-    # Define Timezone
-    ny_tz = pytz.timezone('America/New_York')
-
     # --- Initialize Global Session State ---
-    if "global_dt" not in st.session_state:
-        start_date = st.session_state.get("global_latest_db_date", datetime.date.today())
-        # Default start: 9:29 AM ET (Pre-open)
-        dt_ny = datetime.datetime.combine(start_date, datetime.time(9, 29))
-        st.session_state.global_dt = ny_tz.localize(dt_ny).astimezone(pytz.UTC)
-    
-    if "global_playing" not in st.session_state:
-        st.session_state.global_playing = False
-        
-    if "global_speed_val" not in st.session_state:
-        st.session_state.global_speed_val = 1.0 
-
-    if "replay_active" not in st.session_state:
-        st.session_state.replay_active = False
+    # Single defaults pass; default start is 9:29 AM ET (Pre-open)
+    start_date = st.session_state.get("global_latest_db_date", datetime.date.today())
+    for key, value in (
+        ("global_dt", market_open_utc(start_date)),
+        ("global_playing", False),
+        ("global_speed_val", 1.0),
+        ("replay_active", False),
+        ("global_picker_val", start_date),
+    ):
+        st.session_state.setdefault(key, value)
 
-    if "global_picker_val" not in st.session_state:
-        st.session_state.global_picker_val = st.session_state.get("global_latest_db_date", datetime.date.today())
+    # global_dt is normalized to tz-aware UTC at every write site
+    # (market_open_utc, timedelta steps), so charts never re-check it;
+    # assert the invariant once here to catch regressions instead
+    assert st.session_state.global_dt.tzinfo is not None, "global_dt must be tz-aware UTC"
 
     # Reset frame-specific flags
     st.session_state.has_valid_data = False
     st.session_state.chart_deltas = {}
+    st.session_state.chart_max_ts = {}
 
     # --- CALLBACKS ---
     def on_date_change():
@@ -429,8 +811,7 @@ def render_workspace_fragment(db_client, num_charts, chart_height):
         st.session_state.global_picker_val = new_date
         
         # 1. Reset Time to 9:29 AM
-        dt_ny = datetime.datetime.combine(new_date, datetime.time(9, 29))
-        st.session_state.global_dt = ny_tz.localize(dt_ny).astimezone(pytz.UTC)
+        st.session_state.global_dt = market_open_utc(new_date)
         
         # 2. Activate Replay State (Planning Mode)
         st.session_state.global_playing = False
@@ -454,17 +835,24 @@ def render_workspace_fragment(db_client, num_charts, chart_height):
 
     def on_pause_click():
         st.session_state.global_playing = False
+
+    def step_delta():
+        # Minimum delta across active charts, memoized in session state:
+        # the set only changes on user action (TF/layout change), not per
+        # playback tick, so don't re-scan it 10x/s in the clock fragment.
+        deltas = st.session_state.chart_deltas
+        key = frozenset(deltas.values())
+        if st.session_state.get("_step_delta_key") != key:
+            st.session_state._step_delta_key = key
+            st.session_state._step_delta = min(deltas.values()) if deltas else pd.Timedelta("1min")
+        return st.session_state._step_delta
     
     def on_prev_click():
         if not st.session_state.get("has_valid_data", False):
              st.toast("⚠️ No data available for this date!", icon="🚫")
              return
 
-        if st.session_state.chart_deltas:
-            md = min(st.session_state.chart_deltas.values())
-        else:
-            md = pd.Timedelta("1min")
-        st.session_state.global_dt -= md
+        st.session_state.global_dt -= step_delta()
         st.session_state.replay_active = True
 
     def on_next_click():
@@ -472,17 +860,12 @@ def render_workspace_fragment(db_client, num_charts, chart_height):
              st.toast("⚠️ No data available for this date!", icon="🚫")
              return
 
-        if st.session_state.chart_deltas:
-            md = min(st.session_state.chart_deltas.values())
-        else:
-            md = pd.Timedelta("1min")
-        st.session_state.global_dt += md
+        st.session_state.global_dt += step_delta()
         st.session_state.replay_active = True
         
     def on_reset_click():
         # Reset to 9:29 AM on the current date
-        dt_ny = datetime.datetime.combine(st.session_state.global_picker_val, datetime.time(9, 29))
-        st.session_state.global_dt = ny_tz.localize(dt_ny).astimezone(pytz.UTC)
+        st.session_state.global_dt = market_open_utc(st.session_state.global_picker_val)
         st.session_state.global_playing = False
         st.session_state.replay_active = True
         
@@ -490,50 +873,72 @@ def render_workspace_fragment(db_client, num_charts, chart_height):
         for i in range(num_charts):
             st.session_state[f"c{i}_view_mode"] = "Replay Mode"
 
-    # --- RENDER CHART GRID ---
+    # Playback cadence: scheduled fragment reruns replace the old
+    # time.sleep + st.rerun loop, so the session thread never blocks
+    tick_interval = float(st.session_state.global_speed_val) if st.session_state.global_playing else None
+
+    # --- PREFETCH: One Batched Round-Trip For All Charts ---
     current_dt = st.session_state.global_dt
+    tickers = get_available_tickers(db_pool)
 
-    if num_charts == 1:
-        render_chart_unit(0, db_client, chart_height, current_dt, show_border=False, default_tf="1 Min")
-    
-    elif num_charts == 2:
-        c1, c2 = st.columns(2)
-        with c1: render_chart_unit(0, db_client, chart_height, current_dt, default_tf="1 Min")
-        with c2: render_chart_unit(1, db_client, chart_height, current_dt, default_tf="1 Day")
-    
-    elif num_charts == 3:
-        c1, c2 = st.columns(2)
-        with c1: render_chart_unit(0, db_client, chart_height, current_dt, default_tf="1 Min")
-        with c2: render_chart_unit(1, db_client, chart_height, current_dt, default_tf="30 Min")
-        render_chart_unit(2, db_client, chart_height, current_dt, default_tf="1 Day")
-    
-    elif num_charts == 4:
-        c1, c2 = st.columns(2)
-        with c1: render_chart_unit(0, db_client, chart_height, current_dt, default_tf="1 Min")
-        with c2: render_chart_unit(1, db_client, chart_height, current_dt, default_tf="30 Min")
-        c3, c4 = st.columns(2)
-        with c3: render_chart_unit(2, db_client, chart_height, current_dt, default_tf="1 Day")
-        with c4: render_chart_unit(3, db_client, chart_height, current_dt, default_tf="30 Min", default_ticker="SPY")
-
-    # --- Determine Minimum Step ---
-    if st.session_state.chart_deltas:
-        min_delta = min(st.session_state.chart_deltas.values())
-    else:
-        min_delta = pd.Timedelta("1min")
+    for i, (d_tf, d_ticker) in enumerate(CHART_LAYOUT_DEFAULTS[num_charts]):
+        _init_chart_state(i, tickers, default_tf=d_tf, default_ticker=d_ticker)
+
+    specs = []
+    for i in range(num_charts):
+        is_replay = (st.session_state[f"c{i}_view_mode"] == "Replay Mode")
+        if is_replay and current_dt is not None:
+            # Day-bucketed upper bound: stable across every tick within
+            # the replay day, so the cache holds and Turso only ships
+            # rows the chart can actually draw.
+            end_date_str = (current_dt.date() + datetime.timedelta(days=1)).isoformat()
+        else:
+            # Viewer Mode needs the full history.
+            end_date_str = None
+        specs.append((st.session_state[f"c{i}_ticker"], EARLIEST_DATE, end_date_str, st.session_state[f"c{i}_eth"]))
+
+    bundle = fetch_frame_bundle(db_pool, tuple(dict.fromkeys(specs)))
+
+    # --- RENDER CHART GRID ---
+    # Charts repaint on the playback cadence while playing; otherwise they
+    # rerun only on their own widget interactions
+    chart_frag = st.fragment(render_chart_unit, run_every=tick_interval)
+
+    for i, slot in enumerate(_grid(num_charts)):
+        with slot:
+            chart_frag(i, db_pool, chart_height, tickers, bundle,
+                       show_border=(num_charts > 1))
 
     st.markdown("---")
 
-    # --- Display Global Time ---
-    if not st.session_state.get("has_valid_data", False):
-        st.markdown(f"<div class='no-data-msg'>⚠️ No market data available for {st.session_state.global_picker_val}. Select another date.</div>", unsafe_allow_html=True)
-        st.markdown("<div class='global-time' style='color:transparent'>.</div>", unsafe_allow_html=True)
-    elif st.session_state.replay_active:
-        curr_ny = st.session_state.global_dt.astimezone(ny_tz)
-        time_str = curr_ny.strftime('%Y-%m-%d  %H:%M:%S %Z')
-        st.markdown(f"<div class='global-time'>{time_str}</div>", unsafe_allow_html=True)
-    else:
-        # Placeholder to keep layout stable
-        st.markdown("<div class='global-time' style='color:transparent'>.</div>", unsafe_allow_html=True)
+    # --- CLOCK DRIVER + GLOBAL TIME DISPLAY ---
+    # This fragment owns the playback clock: on each scheduled run it
+    # advances global_dt by the minimum active step and refreshes the
+    # time label. When paused, run_every is None and it only repaints
+    # on normal reruns.
+    @st.fragment(run_every=tick_interval)
+    def clock_fragment():
+        if st.session_state.global_playing:
+            max_ts = st.session_state.get("chart_max_ts", {})
+            if max_ts and st.session_state.global_dt >= max(max_ts.values()):
+                # Every chart is past its last bar: pause and rebuild the
+                # workspace with run_every=None so ticks stop entirely
+                st.session_state.global_playing = False
+                st.rerun(scope="app")
+            st.session_state.global_dt += step_delta()
+
+        if not st.session_state.get("has_valid_data", False):
+            st.markdown(f"<div class='no-data-msg'>⚠️ No market data available for {st.session_state.global_picker_val}. Select another date.</div>", unsafe_allow_html=True)
+            st.markdown("<div class='global-time' style='color:transparent'>.</div>", unsafe_allow_html=True)
+        elif st.session_state.replay_active:
+            curr_ny = st.session_state.global_dt.astimezone(NY_TZ)
+            # f-string formatting skips strftime's %Z tz-name lookup
+            st.markdown(f"<div class='global-time'>{curr_ny:%Y-%m-%d  %H:%M:%S} ET</div>", unsafe_allow_html=True)
+        else:
+            # Placeholder to keep layout stable
+            st.markdown("<div class='global-time' style='color:transparent'>.</div>", unsafe_allow_html=True)
+
+    clock_fragment()
 
     # --- RENDER UNIFIED CONTROL BAR ---
     c_date, c_prev, c_play, c_next, c_reset, c_speed = st.columns([2, 0.7, 1.5, 0.7, 1.5, 1.5])
@@ -574,19 +979,14 @@ def render_workspace_fragment(db_client, num_charts, chart_height):
             label_visibility="collapsed"
         )
 
-    # --- EXECUTE PLAY LOOP ---
-    if st.session_state.global_playing:
-        time.sleep(float(st.session_state.global_speed_val))
-        st.session_state.global_dt += min_delta
-        st.rerun()
 
 # ========================================
 # 7. MAIN EXECUTION FLOW
 # ========================================
 
-db_client = get_db_connection()
-if not db_client:
-    # This point is usually unreachable due to st.stop() in get_db_connection
+db_pool = get_db_pool()
+if not db_pool:
+    # This point is usually unreachable due to st.stop() in get_db_pool
     # but kept for safety.
     st.stop()
 
@@ -645,4 +1045,4 @@ else:
     st.session_state["chart_height_px"] = get_dynamic_chart_height(n, viewport_height)
     
     # Render the main application fragment
-    render_workspace_fragment(db_client, n, st.session_state["chart_height_px"])
\ No newline at end of file
+    render_workspace_fragment(db_pool, n, st.session_state["chart_height_px"])
\ No newline at end of file